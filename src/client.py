@@ -1,12 +1,15 @@
 import socket
-import json
 import argparse
+import logging
+import sys
 import time
-from src.network_device import NetworkDevice
+from src.network_device import NetworkDevice, ClientSession
 from src.core import settings
 from src.constants.constants_client import CLIENT_LOGS, CLIENT_ERRORS
 from src.core.settings import DEFAULT_PORT
 
+logger = logging.getLogger(__name__)
+
 #ultimo teste de vez
 class Client(NetworkDevice):
     def __init__(self, server_addr='127.0.0.1', server_port=DEFAULT_PORT, protocol='gbn', max_fragment_size=3, window_size=4):
@@ -19,7 +22,7 @@ class Client(NetworkDevice):
         self.is_connected = False
         # Sliding window buffers
         self.packet_buffer = {}  # Store packets that have been sent but not acknowledged
-        self.ack_received = set()  # Keep track of which packets have been acknowledged
+        self._acked = bytearray(2 * self.window_size)  # SR acked flags, circular buffer indexed by seq % len
         self.last_timeout = 0  # Track when the last timeout occurred
         self.retry_count = 0    # Track retry attempts
         self.max_retries = 5    # Maximum number of retries before giving up
@@ -30,42 +33,54 @@ class Client(NetworkDevice):
         # For SR, window also includes base and window size
         window_start = self.base_seq_num
         window_end = window_start + self.window_size - 1
-        print(CLIENT_LOGS.WINDOW_SR.format(window_start=window_start, window_end=window_end))
+        logger.debug(CLIENT_LOGS.WINDOW_SR, window_start, window_end)
         # For SR, show which packets have been acked within the window
-        acked_in_window = [seq for seq in self.ack_received if window_start <= seq <= window_end]
+        acked_in_window = [seq for seq in range(window_start, window_end + 1) if self._acked[seq % len(self._acked)]]
         if acked_in_window:
-            print(CLIENT_LOGS.WINDOW_ACKED.format(acked_in_window=sorted(acked_in_window)))
+            logger.debug(CLIENT_LOGS.WINDOW_ACKED, acked_in_window)
         
         # Show packets that haven't been acked yet
         unacked = [seq for seq in range(window_start, min(self.next_seq_num, window_end + 1))
-                    if seq not in self.ack_received]
+                    if not self._acked[seq % len(self._acked)]]
         if unacked:
-            print(CLIENT_LOGS.WINDOW_WAITING_ACK.format(unacked=unacked))
+            logger.debug(CLIENT_LOGS.WINDOW_WAITING_ACK, unacked)
     
+    def _recv_reply(self):
+        """
+        Receive the next packet from the server, parsed like parse_packet (None if its checksum fails).
+        Packets are framed out of a persistent buffer, so several replies that arrive in one read are
+        returned one per call instead of being dropped.
+        """
+        rx = self._rx
+        while (packet := rx.next_packet()) is None:
+            if not rx.on_readable():
+                raise ConnectionError(CLIENT_ERRORS.NO_RESPONSE)
+        return self._parsed_packet(*packet)
+
     def connect(self):
         """Establish a connection with the server using the three-way handshake protocol"""
         # No try/except here; let errors bubble up
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._configure_socket(self._socket)  # Before connect, so the buffer sizes apply to the TCP window negotiation
         self._socket.connect((self.server_addr, self.server_port))
+        # Replies are header-only ACK/NACKs or the SYN-ACK, so a reply announcing more than that is rejected
+        self._rx = ClientSession(self._socket, f"{self.server_addr}:{self.server_port}", self.BUFFER_SIZE,
+                                 max_payload=self.max_payload_size())
 
         # STEP 1: SYN - Client → Server
-        print(CLIENT_LOGS.CONNECTED.format(server_addr=self.server_addr, server_port=self.server_port))
-        print(CLIENT_LOGS.SENDING_SYN.format(protocol=self.protocol, max_fragment_size=self.max_fragment_size, window_size=self.window_size))
-        self.handle_packet(settings.SYN_TYPE, json.dumps(self.connection_params))
+        logger.info(CLIENT_LOGS.CONNECTED, self.server_addr, self.server_port)
+        logger.info(CLIENT_LOGS.SENDING_SYN, self.protocol, self.max_fragment_size, self.window_size)
+        self.handle_packet(settings.SYN_TYPE, self.encode_syn(**self.connection_params))
 
         # STEP 2: Wait for SYN-ACK from Server
-        print(CLIENT_LOGS.WAIT_SYNACK)
-        response_packet = self._socket.recv(self.BUFFER_SIZE)
-        if not response_packet:
-            raise ConnectionError(CLIENT_ERRORS.NO_RESPONSE)
-
-        parsed = self.parse_packet(response_packet)
+        logger.info(CLIENT_LOGS.WAIT_SYNACK)
+        parsed = self._recv_reply()
         if not parsed:
             raise ValueError(CLIENT_ERRORS.INVALID_RESPONSE)
 
         # Process SYN-ACK
-        syn_ack_data = json.loads(parsed['payload'])
-        print(CLIENT_LOGS.RECEIVED_SYNACK.format(syn_ack_data=syn_ack_data))
+        syn_ack_data = self.decode_syn_ack(parsed['payload'])
+        logger.info(CLIENT_LOGS.RECEIVED_SYNACK, syn_ack_data)
 
         if syn_ack_data.get('status') != 'ok':
             raise ConnectionError(CLIENT_ERRORS.HANDSHAKE_FAILED.format(message=syn_ack_data.get('message', 'Unknown error')))
@@ -80,14 +95,13 @@ class Client(NetworkDevice):
         self.connection_params['window_size'] = self.window_size
 
         # STEP 3: ACK - Client → Server
-        print(CLIENT_LOGS.SENDING_ACK)
-        ack_data = {'session_id': self.session_id, 'message': 'Connection established'}
-        self.handle_packet(settings.HANDSHAKE_ACK_TYPE, json.dumps(ack_data))
+        logger.info(CLIENT_LOGS.SENDING_ACK)
+        self.handle_packet(settings.HANDSHAKE_ACK_TYPE, self.encode_handshake_ack(self.session_id))
 
         self.handshake_complete = True
         self.is_connected = True
-        print(CLIENT_LOGS.HANDSHAKE_SUCCESS)
-        print(CLIENT_LOGS.CONNECTION_ESTABLISHED.format(protocol=self.protocol, max_fragment_size=self.max_fragment_size, window_size=self.window_size))
+        logger.info(CLIENT_LOGS.HANDSHAKE_SUCCESS)
+        logger.info(CLIENT_LOGS.CONNECTION_ESTABLISHED, self.protocol, self.max_fragment_size, self.window_size)
         return True
 
     def send_message(self, message):
@@ -98,31 +112,29 @@ class Client(NetworkDevice):
             raise ValueError(CLIENT_ERRORS.INVALID_INPUT)
         self.reset_parameters()
         fragments = self.fragment_message(message)
-        print(CLIENT_LOGS.MESSAGE_FRAGMENTED.format(num_chunks=len(fragments), max_fragment_size=self.max_fragment_size))
+        logger.info(CLIENT_LOGS.MESSAGE_FRAGMENTED, len(fragments), self.max_fragment_size)
         for seq_num, fragment in enumerate(fragments):
             self._send_fragment_with_ack(seq_num, fragment, len(fragments))
-        print(CLIENT_LOGS.MESSAGE_SENT.format(num_fragments=len(fragments)))
+        logger.info(CLIENT_LOGS.MESSAGE_SENT, len(fragments))
         return True
 
     def _send_fragment_with_ack(self, seq_num, fragment, total_fragments):
         """Send a single fragment and wait for ACK/NACK, retrying as needed."""
+        last_packet = (seq_num == total_fragments - 1)
+        payload = fragment.encode('utf-8')
+        # Header packed (and CRC computed) once; a NACK resends the same header and payload buffers
+        header = self._make_header(settings.DATA_TYPE, payload, seq_num, last_packet)
         while True:
-            encoded_message = fragment.encode('utf-8')
-            last_packet = (seq_num == total_fragments - 1)
-            data_packet = self.create_packet(settings.DATA_TYPE, encoded_message, sequence_num=seq_num, last_packet=last_packet)
-            print(CLIENT_LOGS.SENDING_FRAGMENT.format(current=seq_num+1, total=total_fragments, fragment=fragment, seq_num=seq_num))
-            self._socket.sendall(data_packet)
-            response_packet = self._socket.recv(self.BUFFER_SIZE)
-            if not response_packet:
-                raise ConnectionError(CLIENT_ERRORS.NO_RESPONSE)
-            parsed = self.parse_packet(response_packet)
+            logger.debug(CLIENT_LOGS.SENDING_FRAGMENT, seq_num + 1, total_fragments, fragment, seq_num)
+            self.send_packet(self._socket, settings.DATA_TYPE, payload, seq_num, last_packet, header)
+            parsed = self._recv_reply()
             if not parsed:
                 raise ValueError(CLIENT_ERRORS.INVALID_RESPONSE)
             if parsed['type'] == settings.ACK_TYPE and parsed['sequence'] == seq_num:
-                print(CLIENT_LOGS.SERVER_ACK.format(seq_num=seq_num))
+                logger.debug(CLIENT_LOGS.SERVER_ACK, seq_num)
                 break
             elif parsed['type'] == settings.NACK_TYPE and parsed['sequence'] == seq_num:
-                print(CLIENT_LOGS.SERVER_NACK.format(seq_num=seq_num))
+                logger.debug(CLIENT_LOGS.SERVER_NACK, seq_num)
             else:
                 raise ValueError(CLIENT_ERRORS.UNEXPECTED_RESPONSE.format(parsed=parsed))
 
@@ -131,7 +143,7 @@ class Client(NetworkDevice):
         self.base_seq_num = 0
         self.next_seq_num = 0
         self.packet_buffer.clear()
-        self.ack_received.clear()
+        self._acked = bytearray(2 * self.window_size)  # Window size may have changed since the last message
         self.last_timeout = 0
         self.retry_count = 0  # Reset retry counter for new message
 
@@ -148,10 +160,10 @@ class Client(NetworkDevice):
         """Helper method to process acknowledgments"""
         # Let errors bubble up
         while True:
-            response_packet = self._socket.recv(self.BUFFER_SIZE)
-            if not response_packet:
+            try:
+                parsed = self._recv_reply()
+            except ConnectionError:
                 break
-            parsed = self.parse_packet(response_packet)
             if not parsed:
                 continue
             if parsed['type'] == settings.ACK_TYPE:
@@ -165,7 +177,7 @@ class Client(NetworkDevice):
         
         if self.protocol == 'gbn':
             # Go-Back-N: Move the base forward
-            print(CLIENT_LOGS.RECEIVED_ACK.format(ack_seq=ack_seq))
+            logger.debug(CLIENT_LOGS.RECEIVED_ACK, ack_seq)
             
             if ack_seq < self.base_seq_num:
                 # Duplicate or old ACK, ignore
@@ -181,18 +193,24 @@ class Client(NetworkDevice):
                     del self.packet_buffer[seq]
             
             # Display window update
-            print(CLIENT_LOGS.WINDOW_MOVED.format(old_base=old_base, old_end=old_base + self.window_size - 1, new_base=self.base_seq_num, new_end=self.base_seq_num + self.window_size - 1))
+            logger.debug(CLIENT_LOGS.WINDOW_MOVED, old_base, old_base + self.window_size - 1, self.base_seq_num, self.base_seq_num + self.window_size - 1)
             return
             
         # Selective Repeat: Mark the specific packet as acknowledged
-        print(CLIENT_LOGS.RECEIVED_ACK.format(ack_seq=ack_seq))
+        logger.debug(CLIENT_LOGS.RECEIVED_ACK, ack_seq)
         
+        acked = self._acked
+        if not self.base_seq_num <= ack_seq < self.base_seq_num + len(acked):
+            # Duplicate or out-of-range ACK, its slot belongs to another sequence number
+            return
+
         # Mark this packet as acknowledged
-        self.ack_received.add(ack_seq)
+        acked[ack_seq % len(acked)] = 1
         
         # Move the base if possible
         old_base = self.base_seq_num
-        while self.base_seq_num in self.ack_received:
+        while acked[self.base_seq_num % len(acked)]:
+            acked[self.base_seq_num % len(acked)] = 0
             # Clean up the buffer for the base packet
             if self.base_seq_num in self.packet_buffer:
                 del self.packet_buffer[self.base_seq_num]
@@ -201,7 +219,7 @@ class Client(NetworkDevice):
         
         # Display window update if it moved
         if old_base != self.base_seq_num:
-            print(CLIENT_LOGS.WINDOW_MOVED.format(old_base=old_base, old_end=old_base + self.window_size - 1, new_base=self.base_seq_num, new_end=self.base_seq_num + self.window_size - 1))
+            logger.debug(CLIENT_LOGS.WINDOW_MOVED, old_base, old_base + self.window_size - 1, self.base_seq_num, self.base_seq_num + self.window_size - 1)
 
     def handle_nack(self, parsed):
         """Process a negative acknowledgment packet"""
@@ -209,36 +227,34 @@ class Client(NetworkDevice):
         
         if self.protocol == 'gbn':
             # Go-Back-N: Resend all packets from base to next_seq_num - 1
-            print(CLIENT_LOGS.RECEIVED_NACK.format(nack_seq=nack_seq))
+            logger.debug(CLIENT_LOGS.RECEIVED_NACK, nack_seq)
             for seq in range(self.base_seq_num, self.next_seq_num):
                 if seq in self.packet_buffer:
-                    print(CLIENT_LOGS.RESENDING_PACKET.format(seq=seq))
+                    logger.debug(CLIENT_LOGS.RESENDING_PACKET, seq)
                     self._socket.sendall(self.packet_buffer[seq])
             return
             
         # Selective Repeat: Resend only the NACKed packet
-        print(CLIENT_LOGS.RECEIVED_NACK.format(nack_seq=nack_seq))
+        logger.debug(CLIENT_LOGS.RECEIVED_NACK, nack_seq)
         
         if nack_seq in self.packet_buffer:
-            print(CLIENT_LOGS.RESENDING_PACKET.format(seq=nack_seq))
+            logger.debug(CLIENT_LOGS.RESENDING_PACKET, nack_seq)
             self._socket.sendall(self.packet_buffer[nack_seq])
 
     def disconnect(self):
         """Terminate the connection with the server gracefully"""
         if not self._socket:
             return
-        print(CLIENT_LOGS.INIT_DISCONNECT)
+        logger.info(CLIENT_LOGS.INIT_DISCONNECT)
         disconnect_packet = self.create_packet(settings.DISCONNECT_TYPE, "Disconnect")
         self._socket.sendall(disconnect_packet)
-        print(CLIENT_LOGS.WAIT_DISCONNECT_ACK)
+        logger.info(CLIENT_LOGS.WAIT_DISCONNECT_ACK)
         self._socket.settimeout(2.0)
-        response_packet = self._socket.recv(self.BUFFER_SIZE)
-        if not response_packet:
-            raise ConnectionError(CLIENT_ERRORS.NO_RESPONSE)
-        print(CLIENT_LOGS.SERVER_DISCONNECT_ACK)
+        self._recv_reply()
+        logger.info(CLIENT_LOGS.SERVER_DISCONNECT_ACK)
         self._socket.close()
         self.handshake_complete = False
-        print(CLIENT_LOGS.DISCONNECTED)
+        logger.info(CLIENT_LOGS.DISCONNECTED)
 
 if __name__ == '__main__':
     try:
@@ -251,8 +267,11 @@ if __name__ == '__main__':
                            help='Reliable transfer protocol (Go-Back-N or Selective Repeat)')
         parser.add_argument('--window-size', type=int, default=4,
                            help='Sliding window size (number of packets in flight)')
+        parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='DEBUG',
+                           help='Logging level (DEBUG shows every packet, INFO only connection and message events)')
 
         args = parser.parse_args()
+        logging.basicConfig(level=args.log_level, format='%(message)s', stream=sys.stdout)
 
         # Create client with provided arguments
         client = Client(
@@ -1,30 +1,31 @@
 # constants_client.py
 
+# Log templates use %s placeholders so the logger formats them lazily, e.g. logger.info(TEMPLATE, arg)
 class CLIENT_LOGS:
-    CONNECTED = '[LOG] Connected to server at {server_addr}:{server_port}'
-    SENDING_SYN = '[LOG] Sending SYN packet with protocol={protocol}, max_fragment_size={max_fragment_size}, window_size={window_size}...'
+    CONNECTED = '[LOG] Connected to server at %s:%s'
+    SENDING_SYN = '[LOG] Sending SYN packet with protocol=%s, max_fragment_size=%s, window_size=%s...'
     WAIT_SYNACK = '[LOG] Waiting for SYN-ACK from server...'
-    RECEIVED_SYNACK = '[LOG] Received SYN-ACK: {syn_ack_data}'
+    RECEIVED_SYNACK = '[LOG] Received SYN-ACK: %s'
     SENDING_ACK = '[LOG] Sending final ACK packet...'
     HANDSHAKE_SUCCESS = '[LOG] Handshake completed successfully!'
-    CONNECTION_ESTABLISHED = '[LOG] Connection established with protocol={protocol}, max_fragment_size={max_fragment_size}, window_size={window_size}'
-    MESSAGE_FRAGMENTED = '[LOG] Message fragmented into {num_chunks} chunks of max size {max_fragment_size}'
-    SENDING_FRAGMENT = "[LOG] Sending fragment {current}/{total}: '{fragment}' (seq={seq_num})"
-    SERVER_ACK = '[LOG] Received ACK from server for fragment {seq_num}'
-    SERVER_NACK = '[LOG] Received NACK from server requesting retransmission of fragment {seq_num}'
-    MESSAGE_SENT = '[LOG] Message sent successfully in {num_fragments} fragments'
-    RECEIVED_ACK = '[LOG] Received ACK for sequence {ack_seq}'
-    WINDOW_MOVED = '[WINDOW] Window moved: [{old_base}-{old_end}] → [{new_base}-{new_end}]'
-    RECEIVED_NACK = '[LOG] Received NACK for sequence {nack_seq}'
-    RESENDING_PACKET = '[LOG] Resending packet {seq}'
+    CONNECTION_ESTABLISHED = '[LOG] Connection established with protocol=%s, max_fragment_size=%s, window_size=%s'
+    MESSAGE_FRAGMENTED = '[LOG] Message fragmented into %s chunks of max size %s'
+    SENDING_FRAGMENT = "[LOG] Sending fragment %s/%s: '%s' (seq=%s)"
+    SERVER_ACK = '[LOG] Received ACK from server for fragment %s'
+    SERVER_NACK = '[LOG] Received NACK from server requesting retransmission of fragment %s'
+    MESSAGE_SENT = '[LOG] Message sent successfully in %s fragments'
+    RECEIVED_ACK = '[LOG] Received ACK for sequence %s'
+    WINDOW_MOVED = '[WINDOW] Window moved: [%s-%s] → [%s-%s]'
+    RECEIVED_NACK = '[LOG] Received NACK for sequence %s'
+    RESENDING_PACKET = '[LOG] Resending packet %s'
     INIT_DISCONNECT = '[LOG] Initiating disconnection...'
     WAIT_DISCONNECT_ACK = '[LOG] Waiting for server ACK...'
     SERVER_DISCONNECT_ACK = '[LOG] Recieved server ACK disconnect. Closing socket...'
     DISCONNECTED = '[LOG] Disconnected successfully.'
-    WINDOW_SR = '[WINDOW] SR Window: [{window_start}-{window_end}]'
-    WINDOW_ACKED = '[WINDOW] Acked packets: {acked_in_window}'
-    WINDOW_WAITING_ACK = '[WINDOW] Waiting for ACK: {unacked}'
-    TIMEOUT_RESEND = '[LOG] Timeout detected: Resending packets from {base_seq_num} to {next_seq_num_minus1} (Attempt {retry_count}/{max_retries})'
+    WINDOW_SR = '[WINDOW] SR Window: [%s-%s]'
+    WINDOW_ACKED = '[WINDOW] Acked packets: %s'
+    WINDOW_WAITING_ACK = '[WINDOW] Waiting for ACK: %s'
+    TIMEOUT_RESEND = '[LOG] Timeout detected: Resending packets from %s to %s (Attempt %s/%s)'
 
 class CLIENT_ERRORS:
     NO_RESPONSE = '[ERROR] No response from server'
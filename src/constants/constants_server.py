@@ -1,22 +1,23 @@
 # constants_server.py
 
 # Server log and error messages
+# Log templates use %s placeholders so the logger formats them lazily, e.g. logger.info(TEMPLATE, arg)
 class SERVER_LOGS:
-    START = '[LOG] Server started on {host}:{port}'
-    PROTOCOL = '[LOG] Protocol: {protocol}, Max fragment size: {max_fragment_size} characters'
-    WINDOW = '[LOG] Window size: {window_size} packets'
-    NEW_CONNECTION = '[LOG] New connection from: {client_address}'
-    HANDSHAKE_COMPLETE = '[LOG] Handshake completed with {client_address}'
-    HANDSHAKE_FAILED = '[ERROR] Handshake failed with {client_address}'
+    START = '[LOG] Server started on %s:%s'
+    PROTOCOL = '[LOG] Protocol: %s, Max fragment size: %s characters'
+    WINDOW = '[LOG] Window size: %s packets'
+    NEW_CONNECTION = '[LOG] New connection from: %s'
+    HANDSHAKE_COMPLETE = '[LOG] Handshake completed with %s'
+    HANDSHAKE_FAILED = '[ERROR] Handshake failed with %s'
     SOCKET_CLOSED = '[LOG] Server socket closed'
-    CLIENT_DISCONNECTED = '[LOG] Client {client_address} disconnected successfully.'
-    CONNECTION_CLOSED = '[LOG] Connection with {client_address} closed.'
+    CLIENT_DISCONNECTED = '[LOG] Client %s disconnected successfully.'
+    CONNECTION_CLOSED = '[LOG] Connection with %s closed.'
     CHANNEL_CONFIG = '[CONFIG] Channel conditions updated on server.'
-    WINDOW_GBN = '[WINDOW] GBN Window: [{start}-{end}]'
-    WINDOW_SR = '[WINDOW] SR Window: [{start}-{end}]'
-    WINDOW_BUFFERED = '[WINDOW] Buffered packets: {buffered}'
-    RECONSTRUCTED = '[RECONSTRUCTED] Full message from {client_address}: {full_message}'
-    RECONSTRUCTED_BIN = '[RECONSTRUCTED] Received binary fragments from {client_address} (not shown as text)'
+    WINDOW_GBN = '[WINDOW] GBN Window: [%s-%s]'
+    WINDOW_SR = '[WINDOW] SR Window: [%s-%s]'
+    WINDOW_BUFFERED = '[WINDOW] Buffered packets: %s'
+    RECONSTRUCTED = '[RECONSTRUCTED] Full message from %s: %s'
+    RECONSTRUCTED_BIN = '[RECONSTRUCTED] Received binary fragments from %s (not shown as text)'
 
 class SERVER_ERRORS:
     INVALID_HEADER = '[ERROR] Invalid header received from {client_address}'
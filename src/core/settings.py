@@ -7,7 +7,12 @@ DISCONNECT_TYPE = 0x06     # Disconnect message
 
 GBN = 0  # Go-Back-N
 SR = 1   # Selective Repeat
+PROTOCOL_IDS = {'gbn': GBN, 'sr': SR}
+PROTOCOL_NAMES = {GBN: 'gbn', SR: 'sr'}
+
+HANDSHAKE_OK = 0x00     # SYN-ACK status: parameters accepted
 ERROR_CODE = 99
 
 MAX_RETRIES = 5
+MAX_DELAY_TIME = 60.0  # Longest simulated channel delay, in seconds
 DEFAULT_PORT = 5000 # se a porta padrao tiver ocupada mude pra outra da sua preferencia
\ No newline at end of file
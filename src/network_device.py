@@ -1,11 +1,313 @@
+import math
+import os
 import socket
 import struct
-import hashlib
-import random
-import time
-import struct   
+import zlib
+from random import random as _rand, randrange as _randrange
+from time import sleep as _sleep, monotonic as _monotonic
 from src.core import settings
-import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Packet header: length (4 bytes) + type (1 byte) + seq (2 bytes) + checksum (4 bytes) + last_packet (1 byte)
+_HEADER = struct.Struct('!IBHIB')
+
+# Handshake payloads: SYN (protocol, max_fragment_size, window_size),
+# SYN-ACK (status, protocol, max_fragment_size, window_size, session_id) and final ACK (session_id)
+_SYN = struct.Struct('!BHH')
+_SYN_ACK = struct.Struct('!BBHH8s')
+_HANDSHAKE_ACK = struct.Struct('!8s')
+_MAX_HANDSHAKE_FIELD = 0xFFFF  # max_fragment_size and window_size travel as u16 ('H')
+
+# Channel config payload (message type ERROR_CODE): loss, corruption and delay probabilities, delay time in seconds
+_CHANNEL_CONFIG = struct.Struct('!dddd')
+
+# Payload length limit for sessions that don't set one: anything the header's 32-bit field can express
+_MAX_PAYLOAD = 0xFFFFFFFF
+
+# CRC32 is carried in the header as an unsigned int, so checksums are compared as plain integers
+_checksum = zlib.crc32
+
+# Vectored socket writes are not available on every platform (e.g. Windows)
+_HAS_SENDMSG = hasattr(socket.socket, 'sendmsg')
+
+# sendmsg takes at most IOV_MAX buffers per call (EMSGSIZE beyond), and one read can queue more ACKs than that
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+
+# Per-call non-blocking reads and writes, so selector-driven sessions never wait in recv or send.
+# Where the flag is missing (e.g. Windows) sessions fall back to blocking, which is still safe after a readiness event.
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)
+
+# Replies a non-blocking session may have queued for a client that stopped reading before it is dropped
+_MAX_TXBUF = 1 << 20
+
+def _sendmsg_all(sock: socket.socket, buffers):
+    """Write all buffers with vectored sendmsg calls, resuming after partial writes."""
+    if not _HAS_SENDMSG:
+        sock.sendall(b''.join(buffers))
+        return
+    buffers = [memoryview(buf) for buf in buffers]
+    while buffers:
+        sent = sock.sendmsg(buffers[:_IOV_MAX])
+        # Drop what was fully written and trim a partially written buffer
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if buffers and sent:
+            buffers[0] = buffers[0][sent:]
+
+# ACK/NACK replies carry no payload (the sequence number is in the header), so their checksum is constant
+_EMPTY_CHECKSUM = _checksum(b'')
+
+# Protocol constants checked for every received packet, bound at import so the hot path skips the settings lookups
+_DATA_TYPE = settings.DATA_TYPE
+_ACK_TYPE = settings.ACK_TYPE
+_DISCONNECT_TYPE = settings.DISCONNECT_TYPE
+_CONFIG_TYPE = settings.ERROR_CODE
+_MAX_RETRIES = settings.MAX_RETRIES
+
+# Prebuilt DATA ACKs for the low sequence numbers every message starts from (sequence numbers restart per message)
+_ACK_PACKETS = tuple(_HEADER.pack(0, _ACK_TYPE, seq, _EMPTY_CHECKSUM, 0) for seq in range(256))
+
+# Returned by a channel simulation for a packet that must be handled delay_time later (see ChannelConditions.delay_all)
+_DELAYED = object()
+
+class ChannelConditions:
+    """
+    Simulated channel of one connection: loss, corruption and delay probabilities, plus the per-packet
+    function picked for them once, so the receive loop does not re-evaluate the probabilities for every packet.
+    """
+    __slots__ = ('loss_probability', 'corruption_probability', 'delay_probability', 'delay_time', 'packet_fn',
+                 'verify_checksum', 'nack_on_loss', 'nack_on_corruption')
+
+    def __init__(self, loss_prob=0.0, corruption_prob=0.0, delay_prob=0.0, delay_time=0.0):
+        self.configure(loss_prob, corruption_prob, delay_prob, delay_time)
+
+    def configure(self, loss_prob=0.0, corruption_prob=0.0, delay_prob=0.0, delay_time=0.0):
+        """
+        Set the probabilities (clamped to [0, 1]) and the delay (clamped to MAX_DELAY_TIME) and return the name
+        of the resulting mode. Raises ValueError, leaving the conditions unchanged, for inf/nan values.
+        """
+        if not all(math.isfinite(value) for value in (loss_prob, corruption_prob, delay_prob, delay_time)):
+            raise ValueError(f"Channel conditions must be finite: loss={loss_prob}, corruption={corruption_prob}, "
+                             f"delay={delay_prob}, delay_time={delay_time}")
+        self.loss_probability = loss = max(0.0, min(1.0, loss_prob))
+        self.corruption_probability = corruption = max(0.0, min(1.0, corruption_prob))
+        self.delay_probability = delay = max(0.0, min(1.0, delay_prob))
+        self.delay_time = max(0.0, min(settings.MAX_DELAY_TIME, delay_time))
+        self.packet_fn = self._select_packet_fn()
+        # TCP already rejects damaged segments, so a DATA payload can only fail its checksum if the simulation corrupted it
+        self.verify_checksum = corruption > 0.0
+
+        # Only the 100% modes answer a lost or corrupted packet with a NACK
+        self.nack_on_loss = loss == 1.0
+        self.nack_on_corruption = not self.nack_on_loss and corruption == 1.0
+
+        if self.nack_on_loss:
+            return "Packet Loss"
+        if self.nack_on_corruption:
+            return "Packet Corruption"
+        if delay == 1.0:
+            return "Network Delay"
+        if loss == 0.0 and corruption == 0.0 and delay == 0.0:
+            return "Normal"
+        return "Custom"
+
+    def copy(self):
+        """A channel with the same conditions, for a new connection to change on its own"""
+        return ChannelConditions(self.loss_probability, self.corruption_probability, self.delay_probability, self.delay_time)
+
+    def _select_packet_fn(self):
+        """Pick the simulation for the current probabilities. Mixed probabilities use simulate_channel"""
+        if self.loss_probability == 1.0:
+            return self.drop_all
+        if self.loss_probability == 0.0 and self.corruption_probability == 1.0:
+            return self.corrupt_all
+        if self.loss_probability == 0.0 and self.corruption_probability == 0.0:
+            if self.delay_probability == 0.0:
+                return self.pass_all
+            if self.delay_probability == 1.0:
+                return self.delay_all
+        return self.simulate_channel
+
+    def pass_all(self, data, packet_index=0):
+        """Normal channel: deliver the packet untouched"""
+        return data
+
+    def drop_all(self, data, packet_index=0):
+        """Lose the packet"""
+        logger.debug("[CHANNEL] Packet lost in transmission (seq=%s)!", packet_index)
+        return None
+
+    def corrupt_all(self, data, packet_index=0):
+        """Corrupt one random byte of the packet"""
+        logger.debug("[CHANNEL] Packet corrupted during transmission (seq=%s)!", packet_index)
+        if isinstance(data, bytes) or (isinstance(data, memoryview) and data.readonly):
+            data = bytearray(data)  # Received payloads are writable views, so this only copies for other callers
+        if data:
+            index = _randrange(len(data))
+            data[index] = (data[index] + 1) % 256  # Corrupt a byte in place
+        return data
+
+    def delay_all(self, data, packet_index=0):
+        """
+        Deliver the packet after the configured delay. Returns _DELAYED rather than sleeping: the caller holds
+        the packet and defers its connection, so other clients keep being served meanwhile.
+        """
+        logger.debug("[CHANNEL] Packet delayed by %.2f seconds (seq=%s)", self.delay_time, packet_index)
+        return _DELAYED
+
+    def simulate_channel(self, data, packet_index=0):
+        """
+        Simulate channel conditions (loss, corruption, delay) based on probabilities.
+        """
+        # Simulate packet loss
+        if self.loss_probability == 1.0 or (self.loss_probability > 0.0 and _rand() < self.loss_probability):
+            return self.drop_all(data, packet_index)
+
+        # Simulate packet corruption
+        if self.corruption_probability == 1.0 or (self.corruption_probability > 0.0 and _rand() < self.corruption_probability):
+            return self.corrupt_all(data, packet_index)
+
+        # Simulate network delay
+        if self.delay_probability == 1.0 or (self.delay_probability > 0.0 and _rand() < self.delay_probability):
+            return self.delay_all(data, packet_index)
+
+        return data
+
+class ClientSession:
+    """
+    Receive state of one connection: a persistent buffer that packets are framed out of, plus (on the
+    server) the fragments of the message currently being reassembled and the connection's simulated channel.
+    The client frames replies with it too.
+    """
+    __slots__ = ('sock', 'address', 'handshake_complete', 'recv_flags', 'max_payload', 'rxbuf', 'rxmv', 'start',
+                 'filled', 'expected_len', 'message_buf', 'attempts', 'pending_acks', 'channel', 'resume_at',
+                 'held_packet', 'txbuf')
+
+    def __init__(self, sock: socket.socket, address: str, buffer_size=1024, handshake_complete=True, recv_flags=0,
+                 max_payload=_MAX_PAYLOAD, channel=None):
+        self.sock = sock
+        self.address = address
+        self.channel = channel if channel is not None else ChannelConditions()  # Changed by this client's config packets only
+        self.max_payload = max_payload  # Largest payload_length accepted from the peer
+        self.handshake_complete = handshake_complete  # False while the server still expects SYN / final ACK
+        self.recv_flags = recv_flags  # _MSG_DONTWAIT for sessions served from a selector (sends use it too)
+        self.rxbuf = bytearray(buffer_size)
+        self.rxmv = memoryview(self.rxbuf)
+        self.start = 0  # Offset of the first byte not yet taken by next_packet
+        self.filled = 0  # End of the received bytes in the buffer
+        self.expected_len = None  # Size of the packet at self.start, once its header is in
+        self.message_buf = bytearray()  # Payload bytes of the message being reassembled
+        self.attempts = 0
+        self.pending_acks = []  # ACKs for packets handled in the current read, flushed together
+        self.resume_at = None  # Monotonic deadline while a packet is held back by a simulated delay
+        self.held_packet = None  # (header, payload) of that packet; the packets behind it wait in the buffer
+        self.txbuf = bytearray()  # Replies the socket did not take yet (non-blocking sessions only)
+
+    def on_readable(self):
+        """
+        Do a single recv_into the free part of the buffer. Returns False if the peer closed the connection.
+        Payload views handed out by next_packet are only valid until this is called again.
+        """
+        start, filled = self.start, self.filled
+        if start:
+            # Move the partial packet left over from the last read to the front
+            filled -= start
+            self.rxbuf[:filled] = self.rxbuf[start:self.filled]
+            self.start = 0
+        if self.expected_len is not None and self.expected_len > len(self.rxbuf):
+            rxbuf = bytearray(self.expected_len)
+            rxbuf[:filled] = self.rxmv[:filled]
+            self.rxbuf, self.rxmv = rxbuf, memoryview(rxbuf)
+
+        self.filled = filled
+        try:
+            n = self.sock.recv_into(self.rxmv[filled:], 0, self.recv_flags)
+        except BlockingIOError:
+            return True  # Woken up without data (non-blocking reads only)
+        self.filled = filled + n
+        return n > 0
+
+    def next_packet(self):
+        """
+        Take the next complete packet out of the buffer. Returns the unpacked header fields and the payload,
+        a writable view into the buffer (valid until the next on_readable), or None until more bytes arrive.
+        """
+        start = self.start
+        available = self.filled - start
+        if self.expected_len is None:
+            if available < _HEADER.size:
+                return None
+            # Header is in, now we know how much payload to wait for
+            payload_length = _HEADER.unpack_from(self.rxbuf, start)[0]
+            if payload_length > self.max_payload:
+                # Reject before on_readable grows the buffer to whatever length the peer announced
+                raise ValueError(f"Payload length {payload_length} from {self.address} exceeds {self.max_payload}")
+            self.expected_len = _HEADER.size + payload_length
+
+        packet_size = self.expected_len
+        if available < packet_size:
+            return None
+
+        header = _HEADER.unpack_from(self.rxbuf, start)
+        end = start + packet_size
+        payload = self.rxmv[start + _HEADER.size:end]  # No copy: handlers use it before the next read
+        self.expected_len = None
+        if end == self.filled:
+            self.start = self.filled = 0  # Everything consumed, the next read starts at the front
+        else:
+            self.start = end
+        return header, payload
+
+    def send(self, buffers):
+        """
+        Write replies to the peer. Blocking sessions write them out in full; non-blocking ones send what the
+        socket takes right away and queue the rest in txbuf, which flush sends once the socket is writable.
+        Raises ConnectionError when more than _MAX_TXBUF bytes are queued for a peer that stopped reading.
+        """
+        if not self.recv_flags:  # Blocking session: serves one client, so waiting on it stalls no one else
+            _sendmsg_all(self.sock, buffers)
+            return
+        txbuf = self.txbuf
+        if txbuf:
+            # Earlier replies are still queued; these go behind them to keep the order
+            for buf in buffers:
+                txbuf += buf
+            self.flush()
+        else:
+            if len(buffers) > _IOV_MAX:
+                buffers = (b''.join(buffers),)  # One copy beats several syscalls for a burst of 12-byte ACKs
+            try:
+                if _HAS_SENDMSG:
+                    sent = self.sock.sendmsg(buffers, (), _MSG_DONTWAIT)
+                else:
+                    sent = self.sock.send(b''.join(buffers), _MSG_DONTWAIT)
+            except BlockingIOError:
+                sent = 0
+            for buf in buffers:
+                if sent >= len(buf):
+                    sent -= len(buf)
+                else:
+                    txbuf += memoryview(buf)[sent:]  # Copied: reply buffers are reused
+                    sent = 0
+        if len(txbuf) > _MAX_TXBUF:
+            raise ConnectionError(f"{len(txbuf)} bytes of replies queued for {self.address}, which stopped reading")
+
+    def flush(self):
+        """Send as much of txbuf as the socket takes without blocking. Returns True once nothing is left queued."""
+        txbuf = self.txbuf
+        if txbuf:
+            try:
+                sent = self.sock.send(txbuf, _MSG_DONTWAIT)
+            except BlockingIOError:
+                return False
+            del txbuf[:sent]
+        return not txbuf
 
 class NetworkDevice:
     def __init__(self, server_addr:str, server_port:int, protocol='gbn', max_fragment_size=3, window_size=4):
@@ -13,9 +315,26 @@ class NetworkDevice:
         # Minimum buffer size for receiving packets (header + max payload)
         self.BUFFER_SIZE = 1024
         
-        # Header size is fixed at 11 bytes
-        self.HEADER_SIZE = 11
+        # Header size is fixed at 12 bytes (see _HEADER)
+        self.HEADER_SIZE = _HEADER.size
+
+        self._reply_buf = bytearray(self.HEADER_SIZE)  # Reused for every header-only ACK/NACK
+
+        # Socket tuning applied to connected sockets (see _configure_socket)
+        self.tcp_nodelay = True  # Send small ACK/NACK packets immediately instead of waiting on Nagle
+        self.tcp_quickack = True  # Linux only: leave delayed-ACK mode right away on new connections
+        self.rcvbuf_size = 1 << 20
+        self.sndbuf_size = 1 << 20
+        self.tcp_keepalive = True  # Let the kernel detect dead peers on idle sessions
+
+        # Fairness cap: reads done for one non-blocking session before the selector moves on to other clients
+        self.max_reads_per_event = 16
         
+        # Negotiated in the handshake as u16 fields (see _SYN), so reject values that cannot be encoded
+        for name, value in (('max_fragment_size', max_fragment_size), ('window_size', window_size)):
+            if not 1 <= value <= _MAX_HANDSHAKE_FIELD:
+                raise ValueError(f"{name} must be between 1 and {_MAX_HANDSHAKE_FIELD}, got {value}")
+
         # Connection parameters
         self.connection_params = {
             "protocol": protocol,
@@ -39,6 +358,13 @@ class NetworkDevice:
         self.corruption_probability = 0.0
         self.delay_probability = 0.0
         self.delay_time = 0.0
+        self.channel = ChannelConditions()  # Conditions new sessions start from; each session then has its own copy
+
+        # Handlers for packets that got through the simulated channel, by message type (see _handle_packet)
+        self._packet_handlers = {
+            _DATA_TYPE: self._handle_data,
+            _DISCONNECT_TYPE: self._handle_disconnect_packet,
+        }
         
         self._socket:socket.socket #DO NOT ASSIGN HERE, IT WILL BE ASSIGNED IN THE CONNECT METHOD
     def create_packet(self, message_type, payload, sequence_num=0, last_packet=False):
@@ -46,195 +372,370 @@ class NetworkDevice:
         # Ensure payload is bytes
         if isinstance(payload, str):
             payload = payload.encode('utf-8')
+        return self._make_packet(message_type, payload, sequence_num, last_packet)
+
+    def _make_packet(self, message_type, payload: bytes, sequence_num=0, last_packet=False):
+        """Create a packet from an already-encoded payload (hot path, no type checks)."""
         payload_length = len(payload)
-        # Always calculate checksum here
-        
-        checksum = self.calculate_checksum(payload)
+        # Build header and payload in a single buffer instead of concatenating two bytes objects
+        packet = bytearray(self.HEADER_SIZE + payload_length)
+        _HEADER.pack_into(packet, 0, payload_length, message_type, sequence_num, _checksum(payload), last_packet)
+        packet[self.HEADER_SIZE:] = payload
+        return packet
 
-        # Pack header: length (4 bytes) + type (1 byte) + seq (2 bytes) + checksum (4 bytes) + last_packet (1 byte)
-        header = struct.pack('!IBH4sB', payload_length, message_type, sequence_num, checksum, int(last_packet))
-        return header + payload
+    def _make_reply(self, message_type, sequence_num):
+        """
+        Create a header-only ACK/NACK packet for sequence_num. The packet is written into a buffer
+        reused by every reply, so it must be sent before the next reply is built.
+        """
+        _HEADER.pack_into(self._reply_buf, 0, 0, message_type, sequence_num, _EMPTY_CHECKSUM, 0)
+        return self._reply_buf
 
     def calculate_checksum(self, data):
         """Calculate a checksum for the given data (used only for received packets)."""
         if isinstance(data, str):
             data = data.encode('utf-8')
-        return hashlib.md5(data).digest()[:4]
+        return _checksum(data)
     
-    def handle_packet(self, data_type, payload: str):
-        """Create and send a packet with the given data type and payload"""
-        data_packet = self.create_packet(data_type, payload)
-        self._socket.sendall(data_packet)
+    def encode_syn(self, protocol, max_fragment_size, window_size):
+        """Pack the requested connection parameters into a SYN payload"""
+        return _SYN.pack(settings.PROTOCOL_IDS[protocol], max_fragment_size, window_size)
 
+    def decode_syn(self, payload):
+        """Unpack a SYN payload into the requested connection parameters"""
+        protocol, max_fragment_size, window_size = _SYN.unpack(payload)
+        return {
+            'protocol': settings.PROTOCOL_NAMES[protocol],
+            'max_fragment_size': max_fragment_size,
+            'window_size': window_size
+        }
 
-    def simulate_channel(self, data, packet_index=0):
-        """
-        Simulate channel conditions (loss, corruption, delay) based on probabilities.
-        """
-        # Simulate packet loss
-        if self.loss_probability == 1.0 or (self.loss_probability > 0.0 and random.random() < self.loss_probability):
-            print(f"[CHANNEL] Packet lost in transmission (seq={packet_index})!")
-            return None
+    def encode_syn_ack(self, protocol, max_fragment_size, window_size, session_id, status=settings.HANDSHAKE_OK):
+        """Pack the negotiated connection parameters into a SYN-ACK payload"""
+        return _SYN_ACK.pack(status, settings.PROTOCOL_IDS[protocol], max_fragment_size, window_size, session_id.encode('ascii'))
 
-        # Simulate packet corruption
-        if self.corruption_probability == 1.0 or (self.corruption_probability > 0.0 and random.random() < self.corruption_probability):
-            print(f"[CHANNEL] Packet corrupted during transmission (seq={packet_index})!")
-            data = bytearray(data)
-            index = random.randint(0, len(data) - 1) if len(data) > 0 else 0
-            data[index] = (data[index] + 1) % 256  # Corrupt a byte
-            return bytes(data)
+    def decode_syn_ack(self, payload):
+        """Unpack a SYN-ACK payload into the negotiated connection parameters"""
+        status, protocol, max_fragment_size, window_size, session_id = _SYN_ACK.unpack(payload)
+        return {
+            'status': 'ok' if status == settings.HANDSHAKE_OK else 'error',
+            'protocol': settings.PROTOCOL_NAMES[protocol],
+            'max_fragment_size': max_fragment_size,
+            'window_size': window_size,
+            'session_id': session_id.rstrip(b'\x00').decode('ascii')
+        }
 
-        # Simulate network delay
-        if self.delay_probability == 1.0 or (self.delay_probability > 0.0 and random.random() < self.delay_probability):
-            delay = self.delay_time
-            print(f"[CHANNEL] Packet delayed by {delay:.2f} seconds (seq={packet_index})")
-            time.sleep(delay)
+    def encode_handshake_ack(self, session_id):
+        """Pack the session ID into the final handshake ACK payload"""
+        return _HANDSHAKE_ACK.pack(session_id.encode('ascii'))
 
-        return data
+    def decode_handshake_ack(self, payload):
+        """Unpack the session ID from the final handshake ACK payload"""
+        session_id, = _HANDSHAKE_ACK.unpack(payload)
+        return {'session_id': session_id.rstrip(b'\x00').decode('ascii')}
 
-    def handle_client_messages(self, client_socket: socket.socket, client_address: str):
-        """Continuously receive and process messages from a connected client."""
-        received_fragments = []  # Store received fragments for message reconstruction
-        attempts = 0
-        while client_address in self.client_sessions:
-            try:
+    def encode_channel_config(self, loss_prob, corruption_prob, delay_prob, delay_time):
+        """Pack simulated channel conditions into a config payload"""
+        return _CHANNEL_CONFIG.pack(loss_prob, corruption_prob, delay_prob, delay_time)
 
-                if attempts > settings.MAX_RETRIES:
-                    print("[ERROR] Max attempts number reached, ending program execution...")
-                    break
+    def decode_channel_config(self, payload):
+        """
+        Unpack a config payload into set_channel_conditions keyword arguments. Raises ValueError unless every
+        probability is in [0, 1] and delay_time is in [0, MAX_DELAY_TIME] (NaN fails both checks).
+        """
+        loss_prob, corruption_prob, delay_prob, delay_time = _CHANNEL_CONFIG.unpack(payload)
+        for name, value in (('loss', loss_prob), ('corruption', corruption_prob), ('delay', delay_prob)):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"Invalid {name} probability in channel config: {value}")
+        if not 0.0 <= delay_time <= settings.MAX_DELAY_TIME:
+            raise ValueError(f"Invalid delay time in channel config: {delay_time} (max {settings.MAX_DELAY_TIME}s)")
+        return {
+            'loss_prob': loss_prob,
+            'corruption_prob': corruption_prob,
+            'delay_prob': delay_prob,
+            'delay_time': delay_time
+        }
 
-                # Receive header
-                header = client_socket.recv(self.HEADER_SIZE + 1)  # header is now 12 bytes
-                if not header or len(header) < self.HEADER_SIZE + 1:
-                    print(f"[ERROR] Incomplete or missing header from {client_address}")
-                    break
+    def _sendmsg_all(self, sock: socket.socket, buffers):
+        """Write all buffers with vectored sendmsg calls, resuming after partial writes (blocks until done)."""
+        _sendmsg_all(sock, buffers)
 
-                # Parse header
-                try:
-                    payload_length, message_type, sequence_num, checksum, last_packet = struct.unpack('!IBH4sB', header)
-                except struct.error     as e:
-                    print(f"[ERROR] Failed to unpack header from {client_address}: {e}")
-                    break
+    def _make_header(self, message_type, payload: bytes, sequence_num=0, last_packet=False):
+        """Pack the header for an already-encoded payload; send_packet takes it to resend without re-packing."""
+        return _HEADER.pack(len(payload), message_type, sequence_num, _checksum(payload), last_packet)
 
-                # Receive payload
-                payload = client_socket.recv(payload_length)
-                if len(payload) < payload_length:
-                    print(f"[ERROR] Incomplete payload received from {client_address}")
-                    break
+    def send_packet(self, sock: socket.socket, message_type, payload: bytes, sequence_num=0, last_packet=False,
+                    header=None):
+        """
+        Send a packet with header and payload scattered in one syscall, without concatenating them.
+        Retransmissions pass the header built by _make_header for the first send, so it is not packed again.
+        """
+        if header is None:
+            header = self._make_header(message_type, payload, sequence_num, last_packet)
+        self._sendmsg_all(sock, [header, payload])
 
-            # Handle special channel config packet (message_type 99)
-                try:
-                    config = json.loads(payload.decode('utf-8'))
-                    print(f"[CONFIG] Received channel config from client: {config}")
-                    self.set_channel_conditions(
-                        loss_prob=float(config.get('loss_prob', 0.0)),
-                        corruption_prob=float(config.get('corruption_prob', 0.0)),
-                        delay_prob=float(config.get('delay_prob', 0.0)),
-                        delay_time=float(config.get('delay_time', 0.0))
-                    )
-                    print("[CONFIG] Channel conditions updated on server.")
-                except Exception as e:
-                    print(f"[ERROR] Failed to parse channel config: {e}")
-
-                if message_type == settings.ERROR_CODE:
-                    continue
-
-                # Simulate channel conditions
-                processed_payload = self.simulate_channel(payload, sequence_num)
-                
-                if processed_payload is None:
-                    print(f"[CHANNEL] Packet from {client_address} lost in simulated channel.")
-                    if hasattr(self, 'simulate_loss_and_nack'):
-                        self.simulate_loss_and_nack(client_socket, sequence_num)
-                        attempts+=1
-                    continue
-
-                # Verify checksum
-                calculated_checksum = self.calculate_checksum(processed_payload)
-                if calculated_checksum != checksum:
-                    print(f"[ERROR] Checksum mismatch for packet {sequence_num} from {client_address}")
-                    if hasattr(self, 'simulate_corruption_and_nack'):
-                        self.simulate_corruption_and_nack(client_socket, sequence_num, payload)
-                        attempts+=1
-                    continue
-
-                # Process message based on type
-                if message_type == settings.DATA_TYPE:
-                    try:
-                        decoded_message = self.simulate_channel(payload, sequence_num).decode('utf-8')
-                        print(f"[LOG] Received message fragment from {client_address}: {decoded_message}")
-                        received_fragments.append(decoded_message)
-                    except Exception:
-                        print(f"[LOG] Received binary data from {client_address}: {len(payload)} bytes")
-                        received_fragments.append(payload)
-                    ack_packet = self.create_packet(settings.ACK_TYPE, f"ACK for seq {sequence_num}", sequence_num=sequence_num)
-                    client_socket.sendall(ack_packet)
-                    print(f"[LOG] Sent ACK for sequence {sequence_num}")
-                    attempts = 0
-
-                    if last_packet:
-                        if all(isinstance(frag, str) for frag in received_fragments):
-                            full_message = ''.join(received_fragments)
-                            print(f"[RECONSTRUCTED] Full message from {client_address}: {full_message}")
-                        else:
-                            print(f"[RECONSTRUCTED] Received binary fragments from {client_address} (not shown as text)")
-
-                        received_fragments = []
-
-                elif message_type == settings.DISCONNECT_TYPE:
-                    if self.handle_disconnect(client_socket, client_address):
-                        print(f"[LOG] Client {client_address} disconnected successfully.")
-                        break
+    def handle_packet(self, data_type, payload: bytes):
+        """Create and send a packet with the given data type and payload"""
+        data_packet = self._make_packet(data_type, payload)
+        self._socket.sendall(data_packet)
 
-                else:
-                    print(f"[ERROR] Unknown message type {message_type} from {client_address}")
 
-                if hasattr(self, 'simulate_delay'):
-                    self.simulate_delay()
+    def _configure_socket(self, sock: socket.socket):
+        """Apply the Nagle, keepalive and kernel buffer settings to a TCP socket (client sockets get them before connecting)"""
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.tcp_nodelay))
+        if self.tcp_quickack and hasattr(socket, 'TCP_QUICKACK'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf_size)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf_size)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, int(self.tcp_keepalive))
 
-            except Exception as e:
-                print(f"[ERROR] Error handling messages from {client_address}: {e}")
-                break
+    def open_session(self, client_socket: socket.socket, client_address: str, handshake_complete=True, nonblocking=False):
+        """Tune a client socket and create its receive state (nonblocking=True for selector-driven sessions)"""
+        self._configure_socket(client_socket)
+        recv_flags = _MSG_DONTWAIT if nonblocking else 0
+        return ClientSession(client_socket, client_address, self.BUFFER_SIZE, handshake_complete, recv_flags,
+                             self.max_payload_size(), self.channel.copy())
 
+    def max_payload_size(self):
+        """Largest payload a peer may announce: a fragment of max_fragment_size UTF-8 characters, or a control payload"""
+        return max(4 * self.max_fragment_size, _CHANNEL_CONFIG.size)
 
+    def on_session_readable(self, session: ClientSession):
+        """
+        Read whatever the client socket has and handle every complete packet in the buffer. Non-blocking
+        sessions keep reading while reads come back full, up to max_reads_per_event.
+        Returns False once the connection should be closed.
+        """
+        on_readable = session.on_readable  # Bound once per readiness event
+        try:
+            for _ in range(self.max_reads_per_event):
+                if not on_readable():
+                    logger.error("[ERROR] Incomplete or missing packet from %s", session.address)
+                    return False
+                # A read that filled the buffer may have left more queued in the socket
+                more_pending = session.filled == len(session.rxbuf)
+                if not self._drain_packets(session):
+                    return False
+                # A delayed session must not read until resume_session: the held packet's successors are in the buffer.
+                # Blocking sessions must not read again either: the socket may be empty and recv would wait
+                if session.resume_at is not None or not (more_pending and session.recv_flags):
+                    break
+            self._flush_acks(session)
+        except Exception as e:
+            logger.error("[ERROR] Error handling messages from %s: %s", session.address, e)
+            return False
+        return not session.handshake_complete or session.address in self.client_sessions
 
-        # Clean up session
-        if client_address in self.client_sessions:
-            del self.client_sessions[client_address]
+    def resume_session(self, session: ClientSession):
+        """
+        Handle the packet a simulated delay held back (call once session.resume_at has passed), then the packets
+        buffered behind it. The session may be delayed again. Returns False once the connection should be closed.
+        """
+        header, payload = session.held_packet
+        session.held_packet = session.resume_at = None
+        try:
+            if not self._deliver_packet(session, header, payload) or not self._drain_packets(session):
+                return False
+            self._flush_acks(session)
+        except Exception as e:
+            logger.error("[ERROR] Error handling messages from %s: %s", session.address, e)
+            return False
+        return session.address in self.client_sessions
+
+    def _drain_packets(self, session: ClientSession):
+        """Handle the complete packets in the buffer, stopping early if one gets delayed. False closes the connection"""
+        # Bound once per call rather than looked up for every packet
+        next_packet, handle_packet = session.next_packet, self._handle_packet
+        while (packet := next_packet()) is not None:
+            if session.handshake_complete:
+                if not handle_packet(session, *packet):
+                    return False
+                if session.resume_at is not None:
+                    return True  # Held by the simulated channel; the rest keeps its order behind it
+            elif not self._handle_handshake_packet(session, *packet):
+                return False
+        return True
+
+    def close_session(self, session: ClientSession):
+        """Forget the client session and close its socket"""
+        self.client_sessions.pop(session.address, None)
 
         try:
-            client_socket.close()
-            print(f"[LOG] Connection with {client_address} closed.")
+            session.sock.close()
+            logger.info("[LOG] Connection with %s closed.", session.address)
         except Exception as e:
-            print(f"[ERROR] Failed to close connection with {client_address}: {e}")
-        
+            logger.error("[ERROR] Failed to close connection with %s: %s", session.address, e)
+
+    def handle_client_messages(self, client_socket: socket.socket, client_address: str, handshake_complete=True):
+        """Continuously receive and process messages from a connected client (blocking, one client at a time)."""
+        session = self.open_session(client_socket, client_address, handshake_complete)
+        alive = True
+        while alive:
+            if session.resume_at is None:
+                alive = self.on_session_readable(session)
+            else:
+                # Only this client is being served, so a simulated delay can simply be waited out
+                _sleep(max(0.0, session.resume_at - _monotonic()))
+                alive = self.resume_session(session)
+        self.close_session(session)
+
+    def _flush_acks(self, session: ClientSession):
+        """Send every ACK queued for the session in one vectored write"""
+        if session.pending_acks:
+            session.send(session.pending_acks)
+            session.pending_acks.clear()
+
+    def on_session_writable(self, session: ClientSession):
+        """Send replies queued while the client was not reading. Returns False once the connection should be closed."""
+        try:
+            session.flush()
+        except OSError as e:
+            logger.error("[ERROR] Error sending replies to %s: %s", session.address, e)
+            return False
+        return True
+
+    def handle_disconnect(self, session: ClientSession):
+        """Acknowledge a client's disconnect request"""
+        session.send((_ACK_PACKETS[0],))
+        return True
+
+    def _handle_packet(self, session: ClientSession, header, payload: bytearray):
+        """Process one received packet. Returns False once the connection should be closed."""
+        if session.attempts > _MAX_RETRIES:
+            self._flush_acks(session)
+            logger.error("[ERROR] Max attempts number reached, ending program execution...")
+            return False
+
+        client_address = session.address
+
+        payload_length, message_type, sequence_num, checksum, last_packet = header
+
+        # Handle special channel config packet (message_type 99)
+        if message_type == _CONFIG_TYPE:
+            try:
+                config = self.decode_channel_config(payload)
+                logger.info("[CONFIG] Received channel config from %s: %s", client_address, config)
+                # Only this connection's channel changes; other clients keep their own conditions
+                mode = session.channel.configure(**config)
+                logger.info("[CONFIG] Channel for %s set to %s mode.", client_address, mode)
+            except Exception as e:
+                logger.error("[ERROR] Failed to parse channel config: %s", e)
+            return True
+
+        # Simulate channel conditions
+        channel = session.channel
+        processed_payload = channel.packet_fn(payload, sequence_num)
+
+        if processed_payload is None:
+            logger.debug("[CHANNEL] Packet from %s lost in simulated channel.", client_address)
+            if channel.nack_on_loss:
+                self._flush_acks(session)  # Keep replies in order
+                self._send_nack(session, sequence_num)
+                session.attempts += 1
+            return True
+
+        if processed_payload is _DELAYED:
+            # Hold the packet (copied: the buffer is reused) instead of sleeping; resume_session delivers it
+            self._flush_acks(session)  # Replies to the packets before it are not delayed
+            session.held_packet = (header, bytes(payload))
+            session.resume_at = _monotonic() + channel.delay_time
+            return True
+
+        return self._deliver_packet(session, header, processed_payload)
+
+    def _deliver_packet(self, session: ClientSession, header, payload):
+        """Verify a packet that got through the simulated channel and dispatch it by message type"""
+        client_address = session.address
+        payload_length, message_type, sequence_num, checksum, last_packet = header
+        channel = session.channel
+
+        # Verify checksum (payload is always bytes here, so skip calculate_checksum's str handling)
+        if channel.verify_checksum and _checksum(payload) != checksum:
+            logger.error("[ERROR] Checksum mismatch for packet %s from %s", sequence_num, client_address)
+            if channel.nack_on_corruption:
+                self._flush_acks(session)  # Keep replies in order
+                self._send_nack(session, sequence_num)
+                session.attempts += 1
+            return True
+
+        # Process message based on type
+        handler = self._packet_handlers.get(message_type)
+        if handler is None:
+            logger.error("[ERROR] Unknown message type %s from %s", message_type, client_address)
+        elif not handler(session, sequence_num, last_packet, payload):
+            return False
+        return True
+
+    def _send_nack(self, session: ClientSession, sequence_num):
+        """Ask the client to retransmit a packet the simulated channel lost or corrupted"""
+        session.send((self._make_reply(settings.NACK_TYPE, sequence_num),))
+        logger.debug("[LOG] Sent NACK for sequence %s", sequence_num)
+
+    def _handle_data(self, session: ClientSession, sequence_num, last_packet, payload):
+        """Buffer a DATA fragment and queue its ACK; the message is logged once its last fragment is in."""
+        client_address = session.address
+        # Copy the payload view straight into the reassembly buffer (no per-fragment bytes object);
+        # the message is decoded once, on its last fragment
+        session.message_buf += payload
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[LOG] Received message fragment from %s: %s", client_address, str(payload, 'utf-8', 'replace'))
+        # Queued rather than sent, so a burst of packets from one read is acknowledged in a single syscall
+        if sequence_num < 256:
+            session.pending_acks.append(_ACK_PACKETS[sequence_num])
+        else:
+            session.pending_acks.append(_HEADER.pack(0, _ACK_TYPE, sequence_num, _EMPTY_CHECKSUM, 0))
+        logger.debug("[LOG] Queued ACK for sequence %s", sequence_num)
+        session.attempts = 0
+
+        if last_packet:
+            try:
+                full_message = str(session.message_buf, 'utf-8')
+            except UnicodeDecodeError:
+                logger.info("[RECONSTRUCTED] Received binary fragments from %s (not shown as text)", client_address)
+            else:
+                logger.info("[RECONSTRUCTED] Full message from %s: %s", client_address, full_message)
+
+            session.message_buf.clear()
+        return True
+
+    def _handle_disconnect_packet(self, session: ClientSession, sequence_num, last_packet, payload):
+        """Acknowledge a DISCONNECT. Returns False once the client has been let go."""
+        self._flush_acks(session)
+        if self.handle_disconnect(session):
+            logger.info("[LOG] Client %s disconnected successfully.", session.address)
+            return False
+        return True
+
     def parse_packet(self, packet):
-        """Parse a received packet into its components"""
-        # Check if packet is at least as long as the header (now 12 bytes)
-        header_size = self.HEADER_SIZE + 1  # 11 + 1 for last_packet
+        """
+        Parse a received packet into its components. packet may be a memoryview over a receive buffer,
+        in which case the returned payload is a view into that buffer too.
+        """
+        # Check if packet is at least as long as the header
+        header_size = self.HEADER_SIZE
         if len(packet) < header_size:
-            print(f"[ERROR] Received packet too small: {len(packet)} bytes, expected at least {header_size} bytes")
+            logger.error("[ERROR] Received packet too small: %s bytes, expected at least %s bytes", len(packet), header_size)
             return None
         
-        # Extract header (12 bytes total)
-        header = packet[:header_size]
-        
-        payload_length, message_type, sequence_num, checksum, last_packet = struct.unpack('!IBH4sB', header)
+        # Unpack header in place, without slicing it out of the packet
+        payload_length, message_type, sequence_num, checksum, last_packet = _HEADER.unpack_from(packet)
         
         # Check if we have enough data for the payload
         if len(packet) < header_size + payload_length:
-            print(f"[ERROR] Incomplete packet: expected {header_size + payload_length} bytes, got {len(packet)} bytes")
+            logger.error("[ERROR] Incomplete packet: expected %s bytes, got %s bytes", header_size + payload_length, len(packet))
             return None
         
         # Extract payload
         payload = packet[header_size:header_size+payload_length]
-        
-        # Verify checksum
-        calculated_checksum = self.calculate_checksum(payload)
-        if calculated_checksum != checksum:
-            print("[ERROR] Checksum verification failed!")
+        return self._parsed_packet((payload_length, message_type, sequence_num, checksum, last_packet), payload)
+
+    def _parsed_packet(self, header, payload):
+        """Verify an already framed packet and return it in parse_packet's format (None if the checksum fails)"""
+        payload_length, message_type, sequence_num, checksum, last_packet = header
+        if _checksum(payload) != checksum:
+            logger.error("[ERROR] Checksum verification failed!")
             return None
-            
+
         return {
             'type': message_type,
             'sequence': sequence_num,
@@ -244,61 +745,17 @@ class NetworkDevice:
         }
 
     def set_channel_conditions(self, loss_prob=0.0, corruption_prob=0.0, delay_prob=0.0, delay_time=0.0):
-        """Set the channel conditions for simulation"""
-        self.loss_probability = max(0.0, min(1.0, loss_prob))
-        self.corruption_probability = max(0.0, min(1.0, corruption_prob))
-        self.delay_probability = max(0.0, min(1.0, delay_prob))
-        self.delay_time = max(0.0, delay_time)
-        
-        # Determine simulation mode based on probabilities
-        if self.loss_probability == 1.0:
-            mode = "Packet Loss"
-            print("[CONFIG] Simulating 100% packet loss. All packets will be dropped.")
-            
-            # Simulate packet loss and send NACK
-            def simulate_loss_and_nack(client_socket, sequence_num):
-                print(f"[CHANNEL] Simulating packet loss for sequence {sequence_num}")
-                nack_packet = self.create_packet(settings.NACK_TYPE, f"NACK for seq {sequence_num}", sequence_num=sequence_num)
-                client_socket.sendall(nack_packet)
-                print(f"[LOG] Sent NACK for sequence {sequence_num}")
-            
-            self.simulate_loss_and_nack = simulate_loss_and_nack  # Attach function dynamically
-
-        elif self.corruption_probability == 1.0:
-            mode = "Packet Corruption"
-            print("[CONFIG] Simulating 100% packet corruption. All packets will be corrupted.")
-            
-            # Simulate packet corruption and send NACK
-            def simulate_corruption_and_nack(client_socket, sequence_num, payload):
-                print(f"[CHANNEL] Simulating packet corruption for sequence {sequence_num}")
-                corrupted_payload = bytearray(payload)
-                if len(corrupted_payload) > 0:
-                    corrupted_payload[0] = (corrupted_payload[0] + 1) % 256  # Corrupt the first byte
-                nack_packet = self.create_packet(settings.NACK_TYPE, f"NACK for seq {sequence_num}", sequence_num=sequence_num)
-                client_socket.sendall(nack_packet)
-                print(f"[LOG] Sent NACK for sequence {sequence_num}")
-            
-            self.simulate_corruption_and_nack = simulate_corruption_and_nack  # Attach function dynamically
-
-        elif self.delay_probability == 1.0:
-            mode = "Network Delay"
-            print(f"[CONFIG] Simulating 100% network delay. All packets will be delayed by {self.delay_time:.2f} seconds.")
-            
-            # Simulate delay
-            def simulate_delay():
-                print(f"[CHANNEL] Simulating network delay of {self.delay_time:.2f} seconds.")
-                time.sleep(self.delay_time)
-            
-            self.simulate_delay = simulate_delay  # Attach function dynamically
-
-        elif self.loss_probability == 0.0 and self.corruption_probability == 0.0 and self.delay_probability == 0.0:
-            mode = "Normal"
-            print("[CONFIG] Normal mode. No packet loss, corruption, or delay.")
-        else:
-            mode = "Custom"
-            print(f"[CONFIG] Custom mode: loss={self.loss_probability}, corruption={self.corruption_probability}, delay={self.delay_probability}, delay_time={self.delay_time}s")
-        
-        print(f"[CONFIG] Channel set to {mode} mode.")
+        """Set the channel conditions for simulation (on the server, the conditions new connections start from)"""
+        channel = self.channel
+        mode = channel.configure(loss_prob, corruption_prob, delay_prob, delay_time)
+        self.loss_probability = channel.loss_probability
+        self.corruption_probability = channel.corruption_probability
+        self.delay_probability = channel.delay_probability
+        self.delay_time = channel.delay_time
+
+        if mode == "Custom":
+            logger.info("[CONFIG] Custom mode: loss=%s, corruption=%s, delay=%s, delay_time=%ss", self.loss_probability, self.corruption_probability, self.delay_probability, self.delay_time)
+        logger.info("[CONFIG] Channel set to %s mode.", mode)
 
     def update_simulation_params(self, loss_prob=0.0, corruption_prob=0.0, delay_prob=0.0, delay_time=0.0):
         """Update local simulation parameters for status display (client-side only)."""
@@ -308,7 +765,8 @@ class NetworkDevice:
         self.delay_time = delay_time
 
 # Example usage of the NetworkDevice class
-device = NetworkDevice("127.0.0.1", 8080)
-device.set_channel_conditions(loss_prob=1.0)  # Simula 100% de perda de pacotes
-device.set_channel_conditions(corruption_prob=1.0)  # Simula 100% de corrupção
-device.set_channel_conditions(delay_prob=1.0, delay_time=2.0)  # Simula 100% de atraso com 2 segundos
\ No newline at end of file
+if __name__ == "__main__":
+    device = NetworkDevice("127.0.0.1", 8080)
+    device.set_channel_conditions(loss_prob=1.0)  # Simula 100% de perda de pacotes
+    device.set_channel_conditions(corruption_prob=1.0)  # Simula 100% de corrupção
+    device.set_channel_conditions(delay_prob=1.0, delay_time=2.0)  # Simula 100% de atraso com 2 segundos
\ No newline at end of file
@@ -1,27 +1,61 @@
+import os
 import socket
-import hashlib
+import selectors
+import heapq
+import time
+import secrets
 import argparse
-import json
+import logging
+import logging.handlers
+import queue
+import sys
 from src.network_device import NetworkDevice
 from src.core import settings
 from src.constants.constants_server import SERVER_LOGS, SERVER_ERRORS
 from src.core.settings import DEFAULT_PORT
 
+logger = logging.getLogger(__name__)
+
+# Selector interest for a session with replies still queued in its txbuf
+_READ_WRITE = selectors.EVENT_READ | selectors.EVENT_WRITE
+
 # We'll remove the direct import of ServerTerminalUI to avoid circular dependencies
 
 
+class Session:
+    """Connection parameters negotiated with one client during the handshake"""
+    __slots__ = ('protocol', 'max_fragment_size', 'window_size', 'session_id', 'handshake_complete', 'socket',
+                 'expected_seq_num')
+
+    def __init__(self, protocol, max_fragment_size, window_size, session_id, client_socket: socket.socket):
+        self.protocol = protocol
+        self.max_fragment_size = max_fragment_size
+        self.window_size = window_size
+        self.session_id = session_id
+        self.handshake_complete = False
+        self.socket = client_socket
+        self.expected_seq_num = 0  # For GBN
+
+
 class Server(NetworkDevice):
-    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, protocol='gbn', max_fragment_size=3, window_size=4):
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, protocol='gbn', max_fragment_size=3, window_size=4,
+                 reuse_port=False):
         super().__init__(host, port, protocol, max_fragment_size, window_size)
         self.host = host
         self.port = port
         self.client_sessions = {}
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            # Lets several worker processes bind the same port; the kernel spreads new connections across them
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if hasattr(socket, 'TCP_DEFER_ACCEPT'):
+            # Linux only: don't wake accept() until the client's SYN packet has arrived (1 second timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, 1)
 
     def handle_syn(self, client_socket: socket.socket, client_address:str, data:dict):
         """Process SYN request during handshake and negotiate connection parameters"""
-        print(f'[LOG] Received SYN from {client_address}: {data}')
+        logger.info('[LOG] Received SYN from %s: %s', client_address, data)
         
         # Extract and validate connection parameters
         client_protocol = data.get('protocol', self.protocol)
@@ -32,111 +66,185 @@ class Server(NetworkDevice):
         max_fragment_size = min(requested_fragment_size, self.max_fragment_size)
         
         # Generate a unique session ID
-        session_id = hashlib.md5(f"{client_address}{socket.gethostname()}".encode()).hexdigest()[:8]
+        session_id = secrets.token_hex(4)
         
         # Store session information
-        self.client_sessions[client_address] = {
-            'protocol': client_protocol,
-            'max_fragment_size': max_fragment_size,
-            'window_size': requested_window_size,
-            'session_id': session_id,'127.0.0.1'
-            'handshake_complete': False,
-            'socket': client_socket,
-            'expected_seq_num': 0,  # For GBN
-        }
+        self.client_sessions[client_address] = Session(
+            client_protocol, max_fragment_size, requested_window_size, session_id, client_socket
+        )
         
         # Prepare SYN-ACK response with negotiated parameters
-        response = {
-            'status': 'ok',
-            'protocol': client_protocol,
-            'max_fragment_size': max_fragment_size,
-            'window_size': requested_window_size,
-            'session_id': session_id,
-            'message': 'SYN-ACK: Parameters accepted'
-        }
+        response = self.encode_syn_ack(client_protocol, max_fragment_size, requested_window_size, session_id)
         
         # Send SYN-ACK
-        packet = self.create_packet(settings.ACK_TYPE, json.dumps(response))
+        packet = self._make_packet(settings.ACK_TYPE, response)
         client_socket.sendall(packet)
         return session_id
 
     def handle_ack(self, client_address:str, data:dict):
         """Process final ACK to complete handshake"""
-        print(f'[LOG] Received ACK from {client_address}: {data}')
-        if client_address not in self.client_sessions:
+        logger.info('[LOG] Received ACK from %s: %s', client_address, data)
+        session = self.client_sessions.get(client_address)
+        if session is None:
             return False
-            
-        self.client_sessions[client_address]['handshake_complete'] = True
-        print(f'[LOG] Handshake completed for client {client_address}')
-        return True
 
+        session.handshake_complete = True
+        logger.info('[LOG] Handshake completed for client %s', client_address)
+        return True
 
-    def process_handshake(self, client_socket: socket.socket, client_address: str):
-        """Manage the complete three-way handshake process"""
-        # Let exceptions bubble up, handle/log in main loop
-        header = client_socket.recv(self.BUFFER_SIZE)
-        if not header or len(header) < self.HEADER_SIZE:
-            raise ValueError(SERVER_ERRORS.INVALID_HEADER.format(client_address=client_address))
 
-        parsed = self.parse_packet(header)
-        if not parsed:
+    def _handle_handshake_packet(self, session, header, payload):
+        """Advance a client through SYN and final ACK, one packet at a time (both serving modes)"""
+        client_address = session.address
+        message_type, checksum = header[1], header[3]
+        if self.calculate_checksum(payload) != checksum:
             raise ValueError(SERVER_ERRORS.PARSE_PACKET.format(client_address=client_address))
 
-        if parsed['type'] != settings.SYN_TYPE:
-            raise ValueError(SERVER_ERRORS.EXPECTED_SYN.format(msg_type=parsed['type']))
-
-        data = json.loads(parsed['payload'])
-        client_protocol = data.get('protocol', 'gbn')
-        print(f"[LOG] Client requesting protocol: {client_protocol}")
-        self.handle_syn(client_socket, client_address, data)
-
-        # Wait for final ACK
-        header = client_socket.recv(self.BUFFER_SIZE)
-        parsed = self.parse_packet(header)
-        if not parsed:
-            raise ValueError(SERVER_ERRORS.FAILED_ACK.format(client_address=client_address))
+        if client_address not in self.client_sessions:
+            if message_type != settings.SYN_TYPE:
+                raise ValueError(SERVER_ERRORS.EXPECTED_SYN.format(msg_type=message_type))
+            data = self.decode_syn(payload)
+            logger.info("[LOG] Client requesting protocol: %s", data.get('protocol', 'gbn'))
+            self.handle_syn(session.sock, client_address, data)
+            return True
 
-        if parsed['type'] != settings.HANDSHAKE_ACK_TYPE:
-            raise ValueError(SERVER_ERRORS.EXPECTED_ACK.format(msg_type=parsed['type']))
+        if message_type != settings.HANDSHAKE_ACK_TYPE:
+            raise ValueError(SERVER_ERRORS.EXPECTED_ACK.format(msg_type=message_type))
 
-        data = json.loads(parsed['payload'])
+        data = self.decode_handshake_ack(payload)
         if not self.handle_ack(client_address, data):
             raise ValueError(SERVER_ERRORS.FAILED_ACK.format(client_address=client_address))
 
-        print(SERVER_LOGS.HANDSHAKE_COMPLETE.format(client_address=client_address))
+        session.handshake_complete = True
+        logger.info(SERVER_LOGS.HANDSHAKE_COMPLETE, client_address)
         return True
 
-    def start(self):
-        """Initialize the server, bind to socket, and begin listening for connections"""
+    def start(self, blocking=False):
+        """
+        Initialize the server, bind to socket, and begin listening for connections.
+        Clients are multiplexed on a single selector loop; blocking=True serves them one at a time instead.
+        """
         try:
             self._socket.bind((self.host, self.port))
             self._socket.listen(5)
-            print(SERVER_LOGS.START.format(host=self.host, port=self.port))
-            print(SERVER_LOGS.PROTOCOL.format(protocol=self.protocol, max_fragment_size=self.max_fragment_size))
-            print(SERVER_LOGS.WINDOW.format(window_size=self.window_size))
+            logger.info(SERVER_LOGS.START, self.host, self.port)
+            logger.info(SERVER_LOGS.PROTOCOL, self.protocol, self.max_fragment_size)
+            logger.info(SERVER_LOGS.WINDOW, self.window_size)
 
-            while True:
+            if blocking:
+                self._serve_blocking()
+            else:
+                self._serve_selector()
+        except KeyboardInterrupt:
+            logger.info("[LOG] Server shutting down gracefully...")
+        finally:
+            self._socket.close()
+            logger.info(SERVER_LOGS.SOCKET_CLOSED)
+
+    def _serve_blocking(self):
+        """Accept clients and run each connection to completion before accepting the next"""
+        while True:
+            try:
+                client_socket, addr = self._socket.accept()
+                client_address = sys.intern(f"{addr[0]}:{addr[1]}")  # Interned: used as the session key for every packet
+                logger.info(SERVER_LOGS.NEW_CONNECTION, client_address)
                 try:
-                    client_socket, addr = self._socket.accept()
-                    client_address = f"{addr[0]}:{addr[1]}"
-                    print(SERVER_LOGS.NEW_CONNECTION.format(client_address=client_address))
-                    try:
-                        if self.process_handshake(client_socket, client_address):
-                            self.handle_client_messages(client_socket, client_address)
-                    except (ConnectionError, ValueError) as e:
-                        print(e)
-                    except Exception as e:
-                        print(e)
-                    finally:
-                        client_socket.close()
-                except KeyboardInterrupt:
-                    print("[LOG] Server shutting down gracefully...")
-                    break
+                    # The handshake goes through the session framer too, so a DATA packet that arrives in the
+                    # same read as the final ACK is kept instead of being dropped with the rest of a raw recv
+                    self.handle_client_messages(client_socket, client_address, handshake_complete=False)
+                except (ConnectionError, ValueError) as e:
+                    logger.error("%s", e)
                 except Exception as e:
-                    print(f"[ERROR] Error accepting new connection: {e}")
+                    logger.error("%s", e)
+                finally:
+                    client_socket.close()
+            except Exception as e:
+                logger.error("[ERROR] Error accepting new connection: %s", e)
+
+    def _serve_selector(self):
+        """
+        Multiplex the listening socket and every connected client on one selector (epoll on Linux).
+        A session held by a simulated delay is unregistered until its deadline instead of sleeping the loop.
+        """
+        selector = selectors.DefaultSelector()
+        self._socket.setblocking(False)  # _accept_client drains the accept queue until it would block
+        selector.register(self._socket, selectors.EVENT_READ)
+        delayed = []  # Heap of (resume_at, id, session) for the sessions waiting out a simulated delay
+        try:
+            while True:
+                timeout = None
+                if delayed:
+                    # Capped as well, so a deadline can never turn into a timeout select() rejects
+                    timeout = min(max(0.0, delayed[0][0] - time.monotonic()), settings.MAX_DELAY_TIME)
+                # Every ready socket is handled before going back to select()
+                for key, events in selector.select(timeout):
+                    session = key.data
+                    if session is None:
+                        self._accept_client(selector)
+                        continue
+                    alive = True
+                    if events & selectors.EVENT_WRITE:
+                        alive = self.on_session_writable(session)
+                    if alive and events & selectors.EVENT_READ:
+                        alive = self.on_session_readable(session)
+                    if not alive:
+                        selector.unregister(key.fileobj)
+                        self.close_session(session)
+                    elif session.resume_at is not None:
+                        selector.unregister(key.fileobj)
+                        heapq.heappush(delayed, (session.resume_at, id(session), session))
+                    else:
+                        # Watch writability only while replies are queued for a client that is slow to read
+                        events = _READ_WRITE if session.txbuf else selectors.EVENT_READ
+                        if key.events != events:
+                            selector.modify(key.fileobj, events, session)
+
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    session = heapq.heappop(delayed)[2]
+                    if not self.resume_session(session):
+                        self.close_session(session)
+                    elif session.resume_at is not None:
+                        heapq.heappush(delayed, (session.resume_at, id(session), session))
+                    else:
+                        selector.register(session.sock, _READ_WRITE if session.txbuf else selectors.EVENT_READ, session)
         finally:
-            self._socket.close()
-            print(SERVER_LOGS.SOCKET_CLOSED)
+            for key in list(selector.get_map().values()):
+                if key.data is not None:
+                    self.close_session(key.data)
+            for _, _, session in delayed:
+                self.close_session(session)
+            selector.close()
+
+    def _accept_client(self, selector: selectors.BaseSelector):
+        """Accept every pending connection and register it with the selector; handshakes run from the loop"""
+        while True:
+            try:
+                client_socket, addr = self._socket.accept()
+            except BlockingIOError:
+                return  # Accept queue drained
+            except Exception as e:
+                logger.error("[ERROR] Error accepting new connection: %s", e)
+                return
+
+            client_address = sys.intern(f"{addr[0]}:{addr[1]}")  # Interned: used as the session key for every packet
+            logger.info(SERVER_LOGS.NEW_CONNECTION, client_address)
+            session = self.open_session(client_socket, client_address, handshake_complete=False, nonblocking=True)
+            selector.register(client_socket, selectors.EVENT_READ, session)
+
+
+def configure_logging(level):
+    """
+    Route log records through a queue that a background thread writes to stdout, so the serving loop never
+    blocks on the terminal. Returns the listener; stop() it on shutdown to flush the remaining records.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logging.basicConfig(level=level, format='%(message)s', handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener.start()
+    return listener
 
 
 if __name__ == '__main__':
@@ -150,8 +258,30 @@ if __name__ == '__main__':
                             help='Reliable transfer protocol (Go-Back-N or Selective Repeat)')
         parser.add_argument('--window-size', type=int, default=4,
                             help='Sliding window size (number of packets in flight)')
+        parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='DEBUG',
+                            help='Logging level (DEBUG shows every packet, INFO only connection and message events)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Server processes sharing the port through SO_REUSEPORT (Linux/BSD only)')
+        parser.add_argument('--tcp-nodelay', action=argparse.BooleanOptionalAction, default=True,
+                            help='Disable Nagle on client connections so ACKs are sent immediately')
+        parser.add_argument('--rcvbuf', type=int, default=1 << 20,
+                            help='Kernel receive buffer size per connection, in bytes')
+        parser.add_argument('--sndbuf', type=int, default=1 << 20,
+                            help='Kernel send buffer size per connection, in bytes')
     
         args = parser.parse_args()
+        if args.workers > 1 and not (hasattr(os, 'fork') and hasattr(socket, 'SO_REUSEPORT')):
+            parser.error('--workers requires fork() and SO_REUSEPORT (Linux/BSD only)')
+
+        # Fork the extra workers before creating the server, so each one binds its own socket
+        is_main_worker = True
+        for _ in range(args.workers - 1):
+            if os.fork() == 0:
+                is_main_worker = False
+                break
+
+        # After forking: every worker needs its own listener thread
+        log_listener = configure_logging(args.log_level)
     
         # Start server with provided arguments
         server = Server(
@@ -159,21 +289,29 @@ if __name__ == '__main__':
             port=args.port,
             max_fragment_size=args.max_fragment_size,
             protocol=args.protocol,
-            window_size=args.window_size
+            window_size=args.window_size,
+            reuse_port=args.workers > 1
         )
+        server.tcp_nodelay = args.tcp_nodelay
+        server.rcvbuf_size = args.rcvbuf
+        server.sndbuf_size = args.sndbuf
         
-        # Use lazy loading for ServerTerminalUI to avoid circular imports
-        # Only import and use it when we actually need it
-        from src.terminal_ui import ServerTerminalUI
-        
-        # Create server terminal UI
-        server_ui = ServerTerminalUI(server)
-        
-        # Display server status
-        server_ui.show_server_status()
+        if is_main_worker:
+            # Use lazy loading for ServerTerminalUI to avoid circular imports
+            # Only import and use it when we actually need it
+            from src.terminal_ui import ServerTerminalUI
+            
+            # Create server terminal UI
+            server_ui = ServerTerminalUI(server)
+            
+            # Display server status
+            server_ui.show_server_status()
         
         # Start the server
-        server.start()
+        try:
+            server.start()
+        finally:
+            log_listener.stop()
     
     except Exception as e:
         print(f"[ERROR] An error occurred: {e}")
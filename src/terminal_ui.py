@@ -2,7 +2,6 @@ import os
 from src.client import Client
 # Remove the direct import from server
 from typing import TYPE_CHECKING
-import json
 
 from src.core import settings
 from src.constants.constants_client import CLIENT_LOGS, CLIENT_ERRORS
@@ -185,15 +184,9 @@ class TerminalUI:
 
         # Send configuration packet to server
         try:
-            config_data = {
-                'type': 'channel_config',
-                'loss_prob': loss_prob,
-                'corruption_prob': corruption_prob,
-                'delay_prob': delay_prob,
-                'delay_time': delay_time
-            }
             # Use a reserved message type, e.g., 99
-            config_packet = self.client.create_packet(settings.ERROR_CODE, json.dumps(config_data))
+            config_payload = self.client.encode_channel_config(loss_prob, corruption_prob, delay_prob, delay_time)
+            config_packet = self.client.create_packet(settings.ERROR_CODE, config_payload)
             self.client._socket.sendall(config_packet)
 
             print("[CONFIG] Channel configuration sent to server.")
@@ -235,15 +228,9 @@ class TerminalUI:
         self.client.set_channel_conditions(loss_prob, corruption_prob, delay_prob, delay_time)
         self.client.update_simulation_params(loss_prob, corruption_prob, delay_prob, delay_time)
         self.client.connect()
-        config_data = {
-            'type': 'channel_config',
-            'loss_prob': loss_prob,
-            'corruption_prob': corruption_prob,
-            'delay_prob': delay_prob,
-            'delay_time': delay_time
-        }
         # Use the reserved config message type, not DATA_TYPE, and do not set last_packet
-        config_packet = self.client.create_packet(settings.ERROR_CODE, json.dumps(config_data))
+        config_payload = self.client.encode_channel_config(loss_prob, corruption_prob, delay_prob, delay_time)
+        config_packet = self.client.create_packet(settings.ERROR_CODE, config_payload)
         self.client._socket.sendall(config_packet)
         self.clear_screen()
         print("[CONFIG] Simulation reset to normal mode")
@@ -274,8 +261,8 @@ class ServerTerminalUI:
         else:
             for addr, session in self.server.client_sessions.items():
                 print(f"\nClient: {addr}")
-                print(f"  Session ID: {session.get('session_id', 'N/A')}")
-                print(f"  Protocol: {session.get('protocol', 'N/A')}")
-                print(f"  Max Fragment Size: {session.get('max_fragment_size', 'N/A')}")
-                print(f"  Handshake Complete: {'Yes' if session.get('handshake_complete', False) else 'No'}")
-                print(f"  Expected Sequence: {session.get('expected_seq_num', 'N/A')}")
\ No newline at end of file
+                print(f"  Session ID: {session.session_id}")
+                print(f"  Protocol: {session.protocol}")
+                print(f"  Max Fragment Size: {session.max_fragment_size}")
+                print(f"  Handshake Complete: {'Yes' if session.handshake_complete else 'No'}")
+                print(f"  Expected Sequence: {session.expected_seq_num}")
\ No newline at end of file
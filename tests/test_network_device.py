@@ -0,0 +1,45 @@
+import unittest
+
+from src.core import settings
+from src.network_device import NetworkDevice
+
+
+class ChannelConfigDecodeTest(unittest.TestCase):
+    def setUp(self):
+        self.device = NetworkDevice('127.0.0.1', 0)
+
+    def test_round_trip(self):
+        payload = self.device.encode_channel_config(0.25, 0.5, 1.0, 2.0)
+        self.assertEqual(self.device.decode_channel_config(payload), {
+            'loss_prob': 0.25, 'corruption_prob': 0.5, 'delay_prob': 1.0, 'delay_time': 2.0
+        })
+
+    def test_rejects_out_of_range_values(self):
+        bad_configs = [
+            (float('nan'), 0.0, 0.0, 0.0),
+            (0.0, 1.5, 0.0, 0.0),
+            (0.0, 0.0, -0.1, 0.0),
+            (0.0, 0.0, 1.0, float('inf')),
+            (0.0, 0.0, 1.0, settings.MAX_DELAY_TIME + 1),
+            (0.0, 0.0, 1.0, -1.0),
+        ]
+        for config in bad_configs:
+            with self.subTest(config=config):
+                with self.assertRaises(ValueError):
+                    self.device.decode_channel_config(self.device.encode_channel_config(*config))
+
+
+
+class HandshakeFieldRangeTest(unittest.TestCase):
+    def test_accepts_u16_bounds(self):
+        device = NetworkDevice('127.0.0.1', 0, max_fragment_size=65535, window_size=1)
+        self.assertEqual(device.decode_syn(device.encode_syn('gbn', 65535, 1))['max_fragment_size'], 65535)
+
+    def test_rejects_values_outside_u16(self):
+        for kwargs in ({'max_fragment_size': 65536}, {'window_size': 65536}, {'max_fragment_size': 0}, {'window_size': 0}):
+            with self.subTest(**kwargs):
+                with self.assertRaisesRegex(ValueError, 'between 1 and 65535'):
+                    NetworkDevice('127.0.0.1', 0, **kwargs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import socket
+import threading
+import time
+import unittest
+
+from src.client import Client
+from src.core import settings
+from src.server import Server
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerChannelConfigTest(unittest.TestCase):
+    """Channel config packets from one client must not take the server down for the others"""
+
+    def setUp(self):
+        self.port = _free_port()
+        self.server = Server(host='127.0.0.1', port=self.port)
+        threading.Thread(target=self.server.start, daemon=True).start()
+        time.sleep(0.2)
+
+    def test_infinite_delay_config_keeps_server_serving(self):
+        attacker = Client(server_port=self.port)
+        attacker.connect()
+        # Packed by hand: the config carries a delay no channel can honour
+        config = attacker.encode_channel_config(0.0, 0.0, 1.0, float('inf'))
+        attacker._socket.sendall(attacker.create_packet(settings.ERROR_CODE, config))
+        # A DATA packet that the channel would hold back for the configured delay
+        attacker._socket.sendall(attacker.create_packet(settings.DATA_TYPE, 'x', 0, True))
+        time.sleep(0.2)
+
+        client = Client(server_port=self.port)
+        client.connect()
+        self.assertTrue(client.send_message('still serving'))
+        client.disconnect()
+        attacker._socket.close()
+
+
+
+class ServerSlowReaderTest(unittest.TestCase):
+    """A client that stops reading its replies must not stall the selector for the others"""
+
+    def setUp(self):
+        self.port = _free_port()
+        self.server = Server(host='127.0.0.1', port=self.port)
+        self.server.sndbuf_size = 4096  # Small kernel buffers, so the ACKs back up quickly
+        threading.Thread(target=self.server.start, daemon=True).start()
+        time.sleep(0.2)
+
+    def test_client_that_never_reads_does_not_block_others(self):
+        attacker = Client(server_port=self.port)
+        attacker.rcvbuf_size = 4096
+        attacker.connect()
+        # Every DATA packet is ACKed; far more ACK bytes than both socket buffers hold, and never read
+        attacker._socket.sendall(attacker.create_packet(settings.DATA_TYPE, 'x', 0, False) * 20000)
+        time.sleep(0.5)
+
+        client = Client(server_port=self.port)
+        client.connect()
+        self.assertTrue(client.send_message('still serving'))
+        client.disconnect()
+        attacker._socket.close()
+
+if __name__ == '__main__':
+    unittest.main()